@@ -6,6 +6,7 @@ Reports on 'Last Calendar Year' and 'This Calendar Year'
 Follow-up list: First shows zero attendance this year, then last year
 """
 
+import os
 import subprocess
 import sys
 
@@ -15,34 +16,87 @@ def install_packages():
     """
     Auto-install required packages.
     - plotly: charting
-    - kaleido: static image export for plotly.write_image()
-    - beautifulsoup4: HTML parsing
+    - kaleido: static image export (one shared engine, see _start_image_engine)
+    - lxml: HTML report parsing
     - requests: API/HTTP
+    - numpy: monthly attendance aggregation
+    - orjson: fast API response decoding and figure JSON serialisation (optional; falls back to json)
     """
-    packages = ['beautifulsoup4', 'plotly', 'kaleido', 'requests']
+    # Provisioned environments can opt out entirely
+    if os.environ.get('SKIP_AUTOINSTALL'):
+        return
+
+    packages = ['lxml', 'plotly', 'kaleido', 'requests', 'numpy', 'orjson']
+
+    # Skip the import probes once this exact package list has been verified
+    sentinel = os.path.join(os.path.expanduser('~'), '.cache', 'church_dash', '.deps_ok_groups')
+    stamp = ','.join(packages)
+    try:
+        with open(sentinel) as f:
+            if f.read() == stamp:
+                return
+    except OSError:
+        pass
+
+    missing = []
     for package in packages:
         try:
-            if package == 'beautifulsoup4':
-                import bs4  # noqa: F401
-            else:
-                __import__(package)
+            __import__(package)
         except ImportError:
-            print(f"Installing {package}...")
-            subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
+            missing.append(package)
+
+    # One pip resolution for everything that is missing
+    if missing:
+        print(f"Installing {', '.join(missing)}...")
+        subprocess.check_call([sys.executable, '-m', 'pip', 'install', '--disable-pip-version-check', '-q', *missing])
+    else:
+        try:
+            os.makedirs(os.path.dirname(sentinel), exist_ok=True)
+            with open(sentinel, 'w') as f:
+                f.write(stamp)
+        except OSError:
+            pass
 
 
 # Install packages first
 install_packages()
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
+from operator import itemgetter
+import numpy as np
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
-from bs4 import BeautifulSoup
+import lxml.etree
+import lxml.html
+import math
 import re
+from string import Template
 import webbrowser
-import os
+import pickle
+import time
+import traceback
+import atexit
+import hashlib
+
+# orjson is optional: faster JSON decoding/encoding when present, stdlib json otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional renderer for the follow-up PNG snapshot
+try:
+    from html2image import Html2Image
+except ImportError:
+    Html2Image = None
 
 # Global variable for API key
 # Get API key from config file
@@ -60,6 +114,87 @@ except AttributeError:
     sys.exit(1)
 BASE_URL = "https://api.elvanto.com/v1/"
 
+# One pooled keep-alive session for API calls and report downloads.
+# Elvanto's read endpoints are POSTs, so retries are allowed on any method.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=None, raise_on_status=False),
+))
+
+# Serialise figures for HTML and Kaleido with orjson's C encoder (handles numpy arrays natively)
+if orjson is not None:
+    pio.json.config.default_engine = 'orjson'
+
+# Elvanto data shifts on a daily cadence, so API responses and report HTML are kept
+# on disk for a short while. ELVANTO_CACHE_TTL overrides every lifetime; --no-cache
+# always goes to the network (and refreshes the cache).
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'church_dash')
+# Lifetimes in seconds, matched to how volatile each source is
+CACHE_TTL = {
+    'groups/getAll': 3600,  # bare group list; requests embedding people use 'default'
+    'report_html': 300,     # attendance reports move with every meeting
+    'default': 600,         # people rosters (incl. group rosters) and everything else
+}
+_CACHE_TTL_OVERRIDE = os.environ.get('ELVANTO_CACHE_TTL')
+if _CACHE_TTL_OVERRIDE:
+    try:
+        CACHE_TTL = dict.fromkeys(CACHE_TTL, int(_CACHE_TTL_OVERRIDE))
+    except ValueError:
+        print(f"⚠️ Ignoring ELVANTO_CACHE_TTL={_CACHE_TTL_OVERRIDE!r} (expected whole seconds); using default cache lifetimes")
+USE_CACHE = '--no-cache' not in sys.argv[1:]
+# ELVANTO_ALLOW_STALE=1 serves the last cached copy, however old, when Elvanto is unreachable
+ALLOW_STALE = os.environ.get('ELVANTO_ALLOW_STALE') == '1'
+
+# Rasterising through Kaleido/headless Chrome is slow, so PNGs are opt-in:
+# python groups.py --png, or EXPORT_PNG=1 for cron/CI runs
+EXPORT_PNG = '--png' in sys.argv[1:] or os.environ.get('EXPORT_PNG', '0') == '1'
+# PNG supersampling; 1 keeps the pixel count down, set DASHBOARD_SCALE=2 for high-DPI output
+PNG_SCALE = float(os.environ.get('DASHBOARD_SCALE', '1'))
+# Output pixel budget; tall grids are scaled down to stay under it
+PNG_MAX_PIXELS = int(os.environ.get('DASHBOARD_MAX_PIXELS', '4000000'))
+
+# Progressive chart categories, checked in order (kids/youth wins over iff)
+_CATEGORY_PATTERNS = (
+    ('kids_youth', re.compile(r'kids club|youth group', re.IGNORECASE)),
+    ('iff', re.compile(r'iff|international food', re.IGNORECASE)),
+)
+
+# Fixed progressive chart colors so they are consistent across ALL subplots
+COLOR_THIS_YEAR = '#3B82F6'  # blue-500
+COLOR_LAST_YEAR = '#F97316'  # orange-500
+COLOR_BENCHMARK = '#22C55E'  # green-500
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Shared trace/axis styles for the progressive grid (plotly copies these on use)
+LINE_THIS_YEAR = dict(color=COLOR_THIS_YEAR, width=3)
+LINE_LAST_YEAR = dict(color=COLOR_LAST_YEAR, width=3)
+LINE_BENCHMARK = dict(color=COLOR_BENCHMARK, width=2, dash='dash')
+XAXIS_STYLE = dict(title=dict(text="Month", font=dict(size=12)))
+YAXIS_STYLE = dict(title=dict(text="Cumulative Attendance", font=dict(size=12)))
+
+# Keywords that mark a group header row in attendance reports
+_GROUP_HEADER_RE = re.compile(
+    r'bible study|youth group|ever attended|kids club|small group|home group',
+    re.IGNORECASE
+)
+# The monthly extractor also treats IFF / International groups as headers
+_MONTHLY_GROUP_HEADER_RE = re.compile(_GROUP_HEADER_RE.pattern + r'|iff|international', re.IGNORECASE)
+# Non-Bible-Study small groups, recognised by name (Kids Club, Youth Group, IFF)
+_SMALL_GROUP_NAME_RE = re.compile(r'kids club|youth group|iff|international food', re.IGNORECASE)
+
+# Report header date cells (dd/mm) and the characters stripped when normalising names
+_DATE_RE = re.compile(r'\d{1,2}/\d{1,2}')
+_NONALNUM_RE = re.compile(r'[^a-zA-Z0-9\s]')
+
+# Extensions shown in the end-of-run listing when no report files were found
+_LISTED_SUFFIXES = frozenset(('html', 'py'))
+
+# Separator line for the console banners
+_BANNER = "=" * 80
+
 
 def get_api_key():
     """Get API key from user input"""
@@ -69,10 +204,82 @@ def get_api_key():
     return API_KEY
 
 
+@lru_cache(maxsize=1)
+def _start_image_engine():
+    """
+    Keep one Kaleido engine alive for every PNG export in this run.
+    Kaleido < 1.0 already reuses its scope; Kaleido >= 1.0 otherwise
+    launches a fresh Chrome for each export.
+    """
+    try:
+        import kaleido
+    except ImportError:
+        return
+    if hasattr(kaleido, 'start_sync_server'):
+        kaleido.start_sync_server()
+        atexit.register(kaleido.stop_sync_server)
+
+
+def _png_scale(width, height):
+    """PNG_SCALE, reduced so width x height x scale^2 stays within PNG_MAX_PIXELS"""
+    pixels = width * height * PNG_SCALE * PNG_SCALE
+    if pixels <= PNG_MAX_PIXELS:
+        return PNG_SCALE
+    return PNG_SCALE * (PNG_MAX_PIXELS / pixels) ** 0.5
+
+
+def _render_png(fig, width, height):
+    """Rasterize a figure to PNG bytes on the shared Kaleido engine"""
+    _start_image_engine()
+    return pio.to_image(fig, format='png', width=width, height=height, scale=_png_scale(width, height))
+
+
+def _save_figure(fig, base_path, width, height, want_png=False, png_future=None):
+    """
+    Save a figure as HTML, and as PNG only when requested.
+    png_future, if given, is a pending _render_png result to write instead of rendering here.
+    Returns the absolute path of the PNG if one was written, otherwise the HTML path.
+    """
+    saved_path = None
+
+    html_path = f"{base_path}.html"
+    try:
+        fig.write_html(html_path, include_plotlyjs='cdn', full_html=True)
+        saved_path = os.path.abspath(html_path)
+        print(f"✅ Saved HTML: {saved_path}")
+    except Exception as e:
+        print(f"⚠️ Could not save HTML: {e}")
+
+    if want_png:
+        # PNG requires kaleido; render once to bytes on the shared engine
+        png_path = f"{base_path}.png"
+        try:
+            png_bytes = png_future.result() if png_future is not None else _render_png(fig, width, height)
+            with open(png_path, 'wb') as f:
+                f.write(png_bytes)
+            saved_path = os.path.abspath(png_path)
+            print(f"✅ Saved PNG: {saved_path}")
+        except Exception as e:
+            print(f"❌ PNG save failed (is 'kaleido' installed?): {e}")
+
+    return saved_path
+
+
+def _open_chart(path):
+    """Auto-open a saved chart in the platform's default viewer"""
+    viewer = {'darwin': ['open'], 'win32': ['cmd', '/c', 'start', '']}.get(sys.platform, ['xdg-open'])
+    try:
+        subprocess.Popen(viewer + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        print("✅ Chart auto-opened.")
+    except Exception as e:
+        print(f"⚠️ Chart saved but could not auto-open: {e}")
+        print(f"   Please open manually: {path}")
+
+
 def html_to_png_via_plotly(html_content, output_path):
     # Plotly cannot render full HTML layouts, but it CAN render text inside figures.
     # So we wrap the HTML text inside a <br>-formatted plotly annotation.
-    # This gives you a PNG output using the same fig.write_image pipeline.
+    # This gives you a PNG output using the same shared Kaleido engine as the charts.
     
     fig = go.Figure()
 
@@ -92,11 +299,69 @@ def html_to_png_via_plotly(html_content, output_path):
         margin=dict(l=10, r=10, t=10, b=10)
     )
 
-    fig.write_image(output_path)
+    _start_image_engine()
+    png_bytes = pio.to_image(fig, format='png', width=1200, height=1600, scale=_png_scale(1200, 1600))
+    with open(output_path, 'wb') as f:
+        f.write(png_bytes)
+
 
+def _cache_path(*key_parts):
+    """On-disk cache file for a request, keyed on its endpoint/URL and parameters
+    (plus an API key hash for API responses, see make_request)"""
+    key = hashlib.sha1(json.dumps(key_parts, sort_keys=True, default=str).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, 'http', f"{key}.pkl")
 
-def make_request(endpoint, params=None):
-    """Make authenticated request to Elvanto API with better debugging"""
+
+def _cache_load(path, kind):
+    """Return the cached value if it is younger than the TTL for kind (see CACHE_TTL), otherwise None"""
+    if not USE_CACHE:
+        return None
+    ttl = CACHE_TTL.get(kind, CACHE_TTL['default'])
+    try:
+        age = time.time() - os.path.getmtime(path)
+        if age < ttl:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            print(f"   {kind}: cache hit (age={age:.0f}s, ttl={ttl}s)")
+            return value
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+    print(f"   {kind}: cache miss")
+    return None
+
+
+def _stale_fallback(path):
+    """Last cached value regardless of age, if ALLOW_STALE is set; otherwise None"""
+    if not ALLOW_STALE:
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    print(f"   ⚠️ serving stale cache from {datetime.fromtimestamp(mtime):%Y-%m-%d %H:%M}")
+    return value
+
+
+def _cache_store(path, value):
+    """Write a cache entry atomically so a crashed run never leaves a partial file.
+    Entries hold names, emails and phone numbers, so they are readable by the owner only."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"   Could not write cache: {e}")
+
+
+def make_request(endpoint, params=None, use_cache=True):
+    """Make authenticated request to Elvanto API with better debugging.
+    use_cache=False always goes to the network and never falls back to a stale copy."""
     api_key = get_api_key()
     if not api_key:
         print("No API key provided")
@@ -104,14 +369,27 @@ def make_request(endpoint, params=None):
     
     url = f"{BASE_URL}{endpoint}.json"
     auth = (api_key, '')
+
+    # A response carrying people (e.g. group rosters) is as volatile as any roster, so it
+    # gets its own cache kind and the default lifetime rather than the endpoint's
+    kind = endpoint
+    if 'people' in (params or {}).get('fields', []):
+        kind = f"{endpoint} (people)"
+    # Key on the API key too, so one account's cached people are never served to another
+    key_id = hashlib.sha256(api_key.encode()).hexdigest()
+    cache_path = _cache_path(key_id, endpoint, params)
+    cached = _cache_load(cache_path, kind) if use_cache else None
+    if cached is not None:
+        return cached
     
     try:
-        response = requests.post(url, json=params, auth=auth, timeout=30)
+        response = _SESSION.post(url, json=params, auth=auth, timeout=30)
         print(f"   API Call: {endpoint} -> Status: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content) if orjson is not None else json.loads(response.content)
             if data.get('status') == 'ok':
+                _cache_store(cache_path, data)
                 return data
             else:
                 error_info = data.get('error', {})
@@ -120,10 +398,10 @@ def make_request(endpoint, params=None):
                 return None
         else:
             print(f"   HTTP Error {response.status_code}: {response.text[:200]}")
-            return None
+            return _stale_fallback(cache_path) if use_cache else None
     except Exception as e:
         print(f"   Request failed: {e}")
-        return None
+        return _stale_fallback(cache_path) if use_cache else None
 
 
 def is_bible_study_group(group):
@@ -148,24 +426,22 @@ def is_small_group(group):
     Check if group is a small group (Bible Study, Kids Club, Youth Group, or IFF).
     Used to identify serving members who ARE in a small group.
     """
-    group_name = group.get('name', '').lower()
-
     # Check by category
     if is_bible_study_group(group):
         return True
 
-    # Check by name for Kids Club, Youth Group, IFF
-    if any(keyword in group_name for keyword in ['kids club', 'youth group', 'iff', 'international food']):
+    # Check by name for Kids Club, Youth Group, IFF (one compiled scan, case-insensitive)
+    if _SMALL_GROUP_NAME_RE.search(group.get('name', '')):
         return True
 
     return False
 
 
 def test_api_connection():
-    """Test API connection"""
+    """Test API connection with a live request (never the cache). It asks for the same
+    first groups page as fetch_all_groups_from_api, which then reuses the stored response."""
     print("Testing API connection...")
-    data = make_request('groups/getAll', {'page_size': 1000, 'page': 1})
-    if data:
+    if make_request('groups/getAll', _groups_page_params(1), use_cache=False):
         print("API connection successful!")
         return True
     else:
@@ -173,25 +449,39 @@ def test_api_connection():
         return False
 
 
+def categorize_group(group_name):
+    """Map a report group name to its progressive chart category"""
+    for category, pattern in _CATEGORY_PATTERNS:
+        if pattern.search(group_name):
+            return category
+    return 'regular_bible_studies'
+
+
+@lru_cache(maxsize=100_000)
 def normalize_name(name):
-    """Normalize a name for comparison"""
+    """Normalize a name for comparison (memoised; the same names recur across years and groups)"""
     if not name:
         return ""
-    return re.sub(r'[^a-zA-Z0-9\s]', '', name.lower()).strip()
+    return _NONALNUM_RE.sub('', name.lower()).strip()
 
 
-def find_attendance_report_groups():
-    """Find attendance report groups for current year, last year, and two years ago"""
+def find_attendance_report_groups(groups=None):
+    """
+    Find attendance report groups for current year, last year, and two years ago.
+    Scans an already-fetched group list when given one, otherwise fetches it.
+    """
     print("Searching for attendance report groups...")
     
-    response = make_request('groups/getAll', {'page_size': 1000})
-    if not response:
+    if groups is None:
+        response = make_request('groups/getAll', {'page_size': 1000})
+        if not response:
+            return None, None, None
+        groups = response['groups'].get('group', [])
+        if not isinstance(groups, list):
+            groups = [groups] if groups else []
+    if not groups:
         return None, None, None
 
-    groups = response['groups'].get('group', [])
-    if not isinstance(groups, list):
-        groups = [groups] if groups else []
-
     current_year_group = None
     last_year_group = None
     two_years_ago_group = None
@@ -235,8 +525,82 @@ def find_attendance_report_groups():
     return current_year_group, last_year_group, two_years_ago_group
 
 
+@lru_cache(maxsize=None)
+def _is_header_style(style, class_attr):
+    """Whether a first cell's style/class marks a group header row (black background or header/group class)"""
+    style = style.lower()
+    class_attr = class_attr.lower()
+    return ('background' in style and 'black' in style) or 'header' in class_attr or 'group' in class_attr
+
+
+def _parse_report_rows(chunks, encoding):
+    """
+    Parse report HTML from an iterable of byte chunks into the first table's rows,
+    as a list of (cells, style, class) tuples. cells are the stripped cell strings;
+    style/class are the raw attributes of the first cell, which is what marks group
+    header rows (see _is_header_style).
+    Rows are taken from a pull parser as each <tr> closes and then freed, so the
+    parse tree never holds more than the row in progress.
+    """
+    parser = lxml.etree.HTMLPullParser(events=('start', 'end'), tag=('table', 'tr'), encoding=encoding)
+    parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+    rows = []
+    first_table = None
+    table_closed = False
+
+    def drain():
+        nonlocal first_table, table_closed
+        for event, elem in parser.read_events():
+            if elem.tag == 'table':
+                if event == 'start' and first_table is None:
+                    first_table = elem
+                elif event == 'end' and elem is first_table:
+                    table_closed = True
+                    return
+                continue
+            # A <tr> that closes while the first table is open belongs to it
+            if event != 'end' or first_table is None:
+                continue
+            cells = elem.xpath('.//td|.//th')
+            if cells:
+                first_cell = cells[0]
+                rows.append((
+                    [cell.text_content().strip() for cell in cells],
+                    first_cell.get('style') or '',
+                    first_cell.get('class') or '',
+                ))
+            else:
+                rows.append(([], '', ''))
+            # Free handled rows (leave rows nested in another row to their parent)
+            if next(elem.iterancestors('tr'), None) is None:
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+
+    for chunk in chunks:
+        # Keep consuming the source (callers cache the full body) but stop parsing after the table
+        if table_closed:
+            continue
+        parser.feed(chunk)
+        drain()
+    if not table_closed:
+        parser.close()
+        drain()
+    return rows
+
+
+def _parse_cached_report(entry):
+    """Parse a cached report entry back into its table rows"""
+    if entry is None:
+        return None
+    return _parse_report_rows((entry['body'],), entry['encoding'])
+
+
 def download_group_attendance_data(group):
-    """Download attendance data from a group (following successful pattern)"""
+    """
+    Download and parse the attendance report for a group, returning its table rows.
+    The HTML is parsed once here; both extractors read the same row matrix.
+    """
     if not group:
         return None
         
@@ -256,88 +620,97 @@ def download_group_attendance_data(group):
     
     print("Found report URL in group")
     
-    # Fetch and parse HTML from the URL
+    cache_path = _cache_path(report_url)
+    cached = _cache_load(cache_path, 'report_html')
+    if cached is not None:
+        print(f"Using cached report ({len(cached['body'])} bytes)")
+        return _parse_cached_report(cached)
+
+    # Fetch and parse HTML from the URL, feeding lxml as the body streams in
     try:
-        import requests
-        response = requests.get(report_url, timeout=60)
-        if response.status_code == 200:
-            content = response.text
-            print(f"Downloaded {len(content)} characters from report URL")
-            return content
-        else:
-            print(f"Failed to fetch report: {response.status_code}")
-            return None
+        with _SESSION.get(report_url, stream=True, timeout=60) as response:
+            if response.status_code != 200:
+                print(f"Failed to fetch report: {response.status_code}")
+                return _parse_cached_report(_stale_fallback(cache_path))
+            chunks = []
+
+            def body_chunks():
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    chunks.append(chunk)
+                    yield chunk
+
+            rows = _parse_report_rows(body_chunks(), response.encoding)
+        body = b''.join(chunks)
+        _cache_store(cache_path, {'body': body, 'encoding': response.encoding})
+        print(f"Downloaded {len(body)} bytes from report URL")
+        return rows
     except Exception as e:
         print(f"Error fetching report: {e}")
-        return None
+        return _parse_cached_report(_stale_fallback(cache_path))
 
 
-def extract_groups_from_attendance_data(html_content):
-    """Extract group names and attendance from HTML report data"""
+def parse_report_header(report_rows):
+    """
+    Read a report's date columns (dd/mm) from its header row in one pass.
+    Returns (date_columns, date_info, month_by_col): the date column indices,
+    column -> date string, and column -> month number (1-12 only).
+    """
+    date_columns = []
+    date_info = {}
+    month_by_col = {}
+    if not report_rows:
+        return date_columns, date_info, month_by_col
+
+    for i, cell_text in enumerate(report_rows[0][0]):
+        if _DATE_RE.match(cell_text):
+            date_columns.append(i)
+            date_info[i] = cell_text
+            try:
+                day, month = cell_text.split('/')
+                month = int(month)
+            except ValueError:
+                continue
+            # Only real months feed the monthly charts (their arrays are indexed 1..12)
+            if 1 <= month <= 12:
+                month_by_col[i] = month
+    return date_columns, date_info, month_by_col
+
+
+def extract_groups_from_attendance_data(report_rows, header=None):
+    """Extract group names and attendance from a report's table rows"""
     print("Parsing attendance data...")
     
-    if not html_content:
+    if report_rows is None:
         print("No content to parse")
         return {}
     
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Find the main table
-    table = soup.find('table')
-    if not table:
-        print("No table found in report")
-        return {}
-    
-    rows = table.find_all('tr')
+    rows = report_rows
     if not rows:
-        print("No rows found in table")
+        print("No table rows found in report")
         return {}
     
     print(f"Found {len(rows)} rows in attendance table")
     
-    # Extract header to find date columns
-    header_row = rows[0] if rows else None
-    date_columns = []
-    date_info = {}  # column_index: date_string
-    
-    if header_row:
-        cells = header_row.find_all(['th', 'td'])
-        for i, cell in enumerate(cells):
-            cell_text = cell.get_text().strip()
-            # Look for date patterns (dd/mm format)
-            if re.match(r'\d{1,2}/\d{1,2}', cell_text):
-                date_columns.append(i)
-                date_info[i] = cell_text
+    # Date columns from the header (shared with the monthly extractor when passed in)
+    date_columns, date_info, _ = header or parse_report_header(rows)
+    if rows[0][0]:
         print(f"Found {len(date_columns)} date columns: {date_columns}")
     
     group_data = {}
     current_group = None
     group_rows = []  # Store all rows for current group to analyze meeting patterns
     
-    for row_idx, row in enumerate(rows[1:], 1):  # Skip header
-        cells = row.find_all(['td', 'th'])
-        if not cells:
+    for row_data, style, class_attr in rows[1:]:  # Skip header
+        if not row_data:
             continue
         
-        # Convert cells to text for easier processing
-        row_data = [cell.get_text().strip() for cell in cells]
-        
         # Check if this is a group header row (black background, contains group name)
-        first_cell = cells[0]
-        is_group_header = False
-        
-        # Check for styling that indicates group header
-        style = first_cell.get('style', '')
-        class_attr = first_cell.get('class', [])
-        
-        if ('background' in style.lower() and 'black' in style.lower()) or \
-           any('header' in str(cls).lower() or 'group' in str(cls).lower() for cls in class_attr):
-            is_group_header = True
+        # Check for styling that indicates group header (memoised per distinct style/class)
+        is_group_header = _is_header_style(style, class_attr)
         
         # Also check if row contains typical group names
         first_cell_text = row_data[0] if row_data else ""
-        if any(keyword in first_cell_text.lower() for keyword in 
-               ['bible study', 'youth group', 'ever attended', 'kids club', 'small group', 'home group']):
+        if _GROUP_HEADER_RE.search(first_cell_text):
             is_group_header = True
         
         if is_group_header:
@@ -368,31 +741,39 @@ def extract_groups_from_attendance_data(html_content):
 
 def process_group_attendance(group_name, group_rows, date_columns, date_info):
     """Process attendance data for a specific group"""
-    group_attendees = []
-    group_all_people = []
-    group_recent_missed = []
+    group_attendees = set()
+    group_all_people = set()
+    group_recent_missed = set()
     member_last_attended = {}  # Track last attended date STRING for each member
     
-    # Find which date columns this group actually used (had meetings)
-    group_meeting_dates = []
-    for col_idx in date_columns:
-        has_data = False
-        for row_data in group_rows:
-            if col_idx < len(row_data):
-                cell = str(row_data[col_idx]).strip().upper()
-                if cell in ['Y', 'N']:  # This date had a meeting for this group
-                    has_data = True
-                    break
-        if has_data:
-            group_meeting_dates.append(col_idx)
+    # Column layout: the name column on its own, and the date cells (already
+    # stripped by _parse_report_rows) as one (people x date columns) block
+    names = [row_data[0] for row_data in group_rows]
+    cells = np.char.upper(np.array(
+        [[row_data[col_idx] if col_idx < len(row_data) else '' for col_idx in date_columns]
+         for row_data in group_rows],
+        dtype=str,
+    ).reshape(len(group_rows), len(date_columns)))
+    attended = cells == 'Y'
+    had_meeting = attended | (cells == 'N')
+    
+    # Date columns this group actually used (anyone marked Y or N)
+    meeting_idx = np.flatnonzero(had_meeting.any(axis=0))
+    group_meeting_dates = [date_columns[i] for i in meeting_idx]
     
     # Get the last 3 meeting dates for this specific group
-    last_3_meetings = group_meeting_dates[-3:] if len(group_meeting_dates) >= 3 else group_meeting_dates
+    last_3_idx = meeting_idx[-3:]
+    last_3_meetings = group_meeting_dates[-3:]
     print(f"   {group_name}: Found {len(group_meeting_dates)} meeting dates, analyzing last {len(last_3_meetings)} meetings")
     
+    # Per-person results from the masks: last attended column (-1 if never),
+    # and whether they had a recent meeting but attended none of them
+    last_attended_idx = np.where(attended, np.arange(len(date_columns)), -1).max(axis=1, initial=-1)
+    recent_missed = had_meeting[:, last_3_idx].any(axis=1) & ~attended[:, last_3_idx].any(axis=1)
+    
     # Process each person in the group
-    for row_data in group_rows:
-        first_cell_value = row_data[0].strip()
+    for person_idx, first_cell_value in enumerate(names):
+        first_cell_value = first_cell_value.strip()
         
         if not first_cell_value or not ',' in first_cell_value:
             continue
@@ -410,87 +791,78 @@ def process_group_attendance(group_name, group_rows, date_columns, date_info):
             full_name = f"{first_name} {last_name}".strip()
             
             # Add to all_people list (everyone who appears in report)
-            group_all_people.append(full_name)
-            
-            # Track last attended date STRING for this person
-            last_attended_col = None
-            for col_idx in group_meeting_dates:
-                if col_idx < len(row_data):
-                    cell = str(row_data[col_idx]).strip().upper()
-                    if cell == 'Y':  # Attended
-                        last_attended_col = col_idx  # Keep updating to get the LAST attendance
-            
-            if last_attended_col is not None and last_attended_col in date_info:
-                # Convert column index to actual date string
-                member_last_attended[full_name] = date_info[last_attended_col]
-            
-            # Check if this person has ANY attendance in any group meeting dates
-            attended_any = False
-            for col_idx in group_meeting_dates:
-                if col_idx < len(row_data):
-                    cell = str(row_data[col_idx]).strip().upper()
-                    if cell == 'Y':  # Attended
-                        attended_any = True
-                        break
+            group_all_people.add(full_name)
             
             # Only add to attendees if they actually attended
-            if attended_any:
-                group_attendees.append(full_name)
+            if last_attended_idx[person_idx] >= 0:
+                group_attendees.add(full_name)
+                last_attended_col = date_columns[last_attended_idx[person_idx]]
+                if last_attended_col in date_info:
+                    # Convert column index to actual date string
+                    member_last_attended[full_name] = date_info[last_attended_col]
             
-            # Check if this person missed the last 3 meetings of THIS group
-            if last_3_meetings:
-                attended_recent = 0
-                had_opportunity = 0
-                
-                for col_idx in last_3_meetings:
-                    if col_idx < len(row_data):
-                        cell = str(row_data[col_idx]).strip().upper()
-                        if cell in ['Y', 'N']:  # They had opportunity to attend
-                            had_opportunity += 1
-                            if cell == 'Y':
-                                attended_recent += 1
-                
-                # If they had opportunity to attend recent meetings but attended none
-                if had_opportunity > 0 and attended_recent == 0:
-                    group_recent_missed.append(full_name)
+            if recent_missed[person_idx]:
+                group_recent_missed.add(full_name)
     
-    unique_attendees = list(set(group_attendees))
-    unique_all_people = list(set(group_all_people))
-    unique_recent_missed = list(set(group_recent_missed))
-    
-    print(f"   {group_name}: {len(unique_attendees)} attendees, {len(unique_recent_missed)} missed last {len(last_3_meetings)} meetings")
+    print(f"   {group_name}: {len(group_attendees)} attendees, {len(group_recent_missed)} missed last {len(last_3_meetings)} meetings")
     
     return {
-        'attendees': unique_attendees,
-        'all_people': unique_all_people,
-        'recent_missed': unique_recent_missed,
+        'attendees': list(group_attendees),
+        'all_people': list(group_all_people),
+        'recent_missed': list(group_recent_missed),
         'member_last_attended': member_last_attended  # Now contains date STRINGS not indices
     }
 
 
+_GROUPS_PAGE_SIZE = 1000
+
+
+def _groups_page_params(page):
+    """groups/getAll parameters for one page of groups with their categories and people"""
+    return {'page': page, 'page_size': _GROUPS_PAGE_SIZE, 'fields': ['people', 'categories']}
+
+
+@lru_cache(maxsize=1)
 def fetch_all_groups_from_api():
-    """Fetch all groups from API"""
+    """
+    Fetch all groups from API; page 1 gives the total, remaining pages are fetched concurrently.
+    Memoised, so the paginated scan runs once per process.
+    """
     print("Fetching groups with categories and people...")
-    all_groups = []
-    page = 1
-    while True:
-        print(f"Groups page {page}...", end=" ")
-        response = make_request('groups/getAll', {
-            'page': page,
-            'page_size': 1000,
-            'fields': ['people', 'categories']
-        })
+    page_size = _GROUPS_PAGE_SIZE
+
+    def fetch_page(page):
+        response = make_request('groups/getAll', _groups_page_params(page))
         if not response or not response.get('groups'):
-            print("Done")
-            break
+            return None, []
         groups = response['groups'].get('group', [])
         if not isinstance(groups, list):
             groups = [groups] if groups else []
-        all_groups.extend(groups)
-        print(f"({len(groups)} groups)")
-        if len(groups) < 1000:  # KEY: Break when fewer than page_size returned
-            break
-        page += 1
+        return response['groups'].get('total'), groups
+
+    print("Groups page 1...", end=" ")
+    total, all_groups = fetch_page(1)
+    print(f"({len(all_groups)} groups)")
+
+    if len(all_groups) == page_size:
+        if total:
+            # Known page count: fan the rest out over the pooled session
+            pages = range(2, -(-int(total) // page_size) + 1)
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                for page, (_, groups) in zip(pages, pool.map(fetch_page, pages)):
+                    print(f"Groups page {page}... ({len(groups)} groups)")
+                    all_groups.extend(groups)
+        else:
+            # No total reported: page serially until a short page
+            page = 2
+            while True:
+                print(f"Groups page {page}...", end=" ")
+                _, groups = fetch_page(page)
+                all_groups.extend(groups)
+                print(f"({len(groups)} groups)")
+                if len(groups) < page_size:
+                    break
+                page += 1
     print(f"Total groups: {len(all_groups)}")
     return all_groups
 
@@ -569,150 +941,135 @@ def fetch_rostered_members():
     return rostered_members
 
 
-def extract_monthly_attendance_data(html_content, year_label):
-    """Extract monthly attendance data from HTML report"""
+def extract_monthly_attendance_data(report_rows, year_label, header=None):
+    """Extract monthly attendance data from a report's table rows"""
     print(f"Extracting monthly attendance data for {year_label}...")
     
-    if not html_content:
-        return {}
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
-    table = soup.find('table')
-    if not table:
+    if report_rows is None:
         return {}
     
-    rows = table.find_all('tr')
+    rows = report_rows
     if not rows:
         return {}
     
-    # Extract header to find date columns and determine months
-    header_row = rows[0] if rows else None
-    date_columns = {}  # column_index: month_number
-    
-    if header_row:
-        cells = header_row.find_all(['th', 'td'])
-        for i, cell in enumerate(cells):
-            cell_text = cell.get_text().strip()
-            # Look for date patterns (dd/mm format)
-            if re.match(r'\d{1,2}/\d{1,2}', cell_text):
-                try:
-                    day, month = cell_text.split('/')
-                    date_columns[i] = int(month)
-                except:
-                    continue
+    # Date columns and their months from the header
+    date_columns = (header or parse_report_header(rows))[2]  # column_index: month_number
     
     print(f"   Found {len(date_columns)} date columns for {year_label}")
     
     monthly_data = {}  # group_name: {month: attendance_count}
+    person_rows = {}  # group_name: [row_data, ...]
     current_group = None
     
-    for row_idx, row in enumerate(rows[1:], 1):  # Skip header
-        cells = row.find_all(['td', 'th'])
-        if not cells:
+    for row_data, style, class_attr in rows[1:]:  # Skip header
+        if not row_data:
             continue
         
-        row_data = [cell.get_text().strip() for cell in cells]
-        
         # Check if this is a group header row
-        first_cell = cells[0]
-        is_group_header = False
-        
-        style = first_cell.get('style', '')
-        class_attr = first_cell.get('class', [])
-        
-        if ('background' in style.lower() and 'black' in style.lower()) or \
-           any('header' in str(cls).lower() or 'group' in str(cls).lower() for cls in class_attr):
-            is_group_header = True
+        is_group_header = _is_header_style(style, class_attr)
         
         first_cell_text = row_data[0] if row_data else ""
-        if any(keyword in first_cell_text.lower() for keyword in 
-               ['bible study', 'youth group', 'ever attended', 'kids club', 'small group', 'home group', 'iff', 'international']):
+        if _MONTHLY_GROUP_HEADER_RE.search(first_cell_text):
             is_group_header = True
         
         if is_group_header:
             current_group = first_cell_text
             if current_group not in monthly_data:
                 monthly_data[current_group] = {}
+                person_rows[current_group] = []
             continue
         
-        # Process individual attendance row
+        # Collect individual attendance rows; they are counted per group below
         if current_group and row_data:
-            first_cell_value = row_data[0].strip()
+            first_cell_value = row_data[0]
             
             if not first_cell_value or not ',' in first_cell_value:
                 continue
             
-            # Count attendances by month for this person
-            for col_idx, month in date_columns.items():
-                if col_idx < len(row_data):
-                    cell = str(row_data[col_idx]).strip().upper()
-                    if cell == 'Y':  # Attended
-                        if month not in monthly_data[current_group]:
-                            monthly_data[current_group][month] = 0
-                        monthly_data[current_group][month] += 1
+            person_rows[current_group].append(row_data)
+    
+    if not date_columns:
+        return monthly_data
+    
+    # Count attendances by month: one Y-mask per group (cells are already stripped),
+    # summed per column and folded into months with a single bincount
+    col_idx = np.fromiter(date_columns.keys(), dtype=np.intp, count=len(date_columns))
+    col_month = np.fromiter(date_columns.values(), dtype=np.intp, count=len(date_columns))
+    width = int(col_idx.max()) + 1
+    for group_name, group_rows in person_rows.items():
+        if not group_rows:
+            continue
+        cells = np.array([row[:width] + [''] * (width - len(row)) for row in group_rows], dtype=str)[:, col_idx]
+        attended_per_col = ((cells == 'Y') | (cells == 'y')).sum(axis=0)
+        counts = np.bincount(col_month, weights=attended_per_col, minlength=13).astype(np.int64)
+        monthly_data[group_name] = {month: count for month, count in enumerate(counts.tolist()) if count}
     
     return monthly_data
 
 
 def create_progressive_attendance_charts(current_monthly_data, last_year_monthly_data, current_year, last_year):
     """Create progressive attendance charts with consistent colors, 3-across layout,
-    save a PNG in the outputs folder, and auto-open it."""
-    
-    import os, math, subprocess, sys
-    from datetime import datetime
-    import plotly.graph_objects as go
-    from plotly.subplots import make_subplots
+    save HTML (plus a PNG with --png) in the outputs folder, and auto-open it.
+    With --png only the Kaleido render starts here, in the background; a function that
+    waits for it, saves and opens the chart is returned for the caller to run."""
 
     print("Creating progressive monthly attendance charts...")
 
     # Create outputs directory
     outputs_dir = 'outputs'
     os.makedirs(outputs_dir, exist_ok=True)
-
-    # ----- Fixed colors so they are consistent across ALL subplots -----
-    COLOR_THIS_YEAR = '#3B82F6'  # blue-500
-    COLOR_LAST_YEAR = '#F97316'  # orange-500
-    COLOR_BENCHMARK = '#22C55E'  # green-500
-
-    # Categorize groups
-    def categorize_group(group_name):
-        name_lower = group_name.lower()
-        if 'kids club' in name_lower or 'youth group' in name_lower:
-            return 'kids_youth'
-        elif 'iff' in name_lower or 'international food' in name_lower:
-            return 'iff'
-        else:
-            return 'regular_bible_studies'
-
-    # Build category totals for each year
-    categories = {'all': {}, 'kids_youth': {}, 'iff': {}, 'regular_bible_studies': {}}
-    for group_name, monthly_counts in (current_monthly_data or {}).items():
-        cat = categorize_group(group_name)
-        for m, cnt in monthly_counts.items():
-            categories[cat][m] = categories[cat].get(m, 0) + cnt
-            categories['all'][m] = categories['all'].get(m, 0) + cnt
-
-    last_year_categories = {'all': {}, 'kids_youth': {}, 'iff': {}, 'regular_bible_studies': {}}
-    for group_name, monthly_counts in (last_year_monthly_data or {}).items():
-        cat = categorize_group(group_name)
-        for m, cnt in monthly_counts.items():
-            last_year_categories[cat][m] = last_year_categories[cat].get(m, 0) + cnt
-            last_year_categories['all'][m] = last_year_categories['all'].get(m, 0) + cnt
-
-    def create_cumulative_data(monthly_data, year):
-        # last_year = full 12 months; this_year = up to current month
-        from datetime import datetime
-        months = list(range(1, 13)) if year == last_year else list(range(1, datetime.now().month + 1))
-        running = 0
-        cumulative = []
-        for m in months:
-            running += int(monthly_data.get(m, 0))
-            cumulative.append(running)
+    base_path = os.path.join(outputs_dir, 'bible_study_progressive_attendance')
+
+    # Skip the render entirely when the inputs match the last saved chart
+    key_file = f"{base_path}.sha"
+    expected_output = f"{base_path}.png" if EXPORT_PNG else f"{base_path}.html"
+    render_key = hashlib.sha256(json.dumps(
+        [current_monthly_data, last_year_monthly_data, current_year, last_year,
+         datetime.now().month, EXPORT_PNG],
+        sort_keys=True, default=str).encode()).hexdigest()
+    try:
+        with open(key_file) as f:
+            if f.read().strip() == render_key and os.path.exists(expected_output):
+                print(f"✅ Attendance data unchanged - keeping existing chart: {os.path.abspath(expected_output)}")
+                _open_chart(os.path.abspath(expected_output))
+                return
+    except OSError:
+        pass
+
+    # Dense per-month vector (index = month number, slot 0 unused)
+    def monthly_vector(monthly_counts):
+        vec = np.zeros(13, dtype=np.int64)
+        for m, cnt in (monthly_counts or {}).items():
+            vec[m] += cnt
+        return vec
+
+    all_groups = sorted((current_monthly_data or {}).keys() | (last_year_monthly_data or {}).keys())
+    # Categorise each group once, shared by both years
+    group_categories = {g: categorize_group(g) for g in all_groups}
+
+    # Build category totals for a year: one vector add per group
+    def accumulate(monthly_data):
+        totals = defaultdict(lambda: np.zeros(13, dtype=np.int64))
+        for group_name, monthly_counts in (monthly_data or {}).items():
+            vec = monthly_vector(monthly_counts)
+            totals[group_categories[group_name]] += vec
+            totals['all'] += vec
+        return totals
+
+    categories = accumulate(current_monthly_data)
+    last_year_categories = accumulate(last_year_monthly_data)
+
+    # last_year = full 12 months; this_year = up to current month
+    last_year_months = list(range(1, 13))
+    this_year_months = list(range(1, datetime.now().month + 1))
+
+    def create_cumulative_data(monthly_vec, year):
+        months = last_year_months if year == last_year else this_year_months
+        # Keep as ndarray so plotly serialises it as a typed array
+        cumulative = np.cumsum(monthly_vec[1:len(months) + 1])
         return months, cumulative
 
     # Individual group list (exclude IFF since it has its own category chart)
-    all_groups = sorted(set(list((current_monthly_data or {}).keys()) +
-                            list((last_year_monthly_data or {}).keys())))
     individual_groups = [g for g in all_groups
                         if not ('iff' in g.lower() or 'international food' in g.lower())]
     num_individual = len(individual_groups)
@@ -722,8 +1079,6 @@ def create_progressive_attendance_charts(current_monthly_data, last_year_monthly
     cols = 3
     rows = math.ceil(total_charts / cols)
 
-    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-
     # Titles: 4 summary + all individuals
     titles = [
         'All Groups Combined',
@@ -754,33 +1109,33 @@ def create_progressive_attendance_charts(current_monthly_data, last_year_monthly
         last_m, last_cum = create_cumulative_data(last_year_categories[cat], last_year)
         this_m, this_cum = create_cumulative_data(categories[cat], current_year)
 
-        last_labels = [month_names[m - 1] for m in last_m]
-        this_labels = [month_names[m - 1] for m in this_m]
+        last_labels = [MONTH_NAMES[m - 1] for m in last_m]
+        this_labels = [MONTH_NAMES[m - 1] for m in this_m]
 
         # 10% benchmark line based on last year total
-        benchmark_target = (last_cum[-1] if last_cum else 0) * 1.10
-        benchmark_line = [(benchmark_target * (i + 1) / 12.0) for i in range(len(this_m))]
+        benchmark_target = (last_cum[-1] if last_cum.size else 0) * 1.10
+        benchmark_line = benchmark_target * np.arange(1, len(this_m) + 1) / 12.0
 
         # Last year
         fig.add_trace(
-            go.Scatter(x=last_labels, y=last_cum, mode='lines+markers',
-                       name=f'{last_year}', line=dict(color=COLOR_LAST_YEAR, width=3),
-                       marker=dict(size=7), showlegend=(i == 0), legendgroup='last'),
+            go.Scattergl(x=last_labels, y=last_cum, mode='lines+markers',
+                         name=f'{last_year}', line=LINE_LAST_YEAR,
+                         marker=dict(size=7), showlegend=(i == 0), legendgroup='last'),
             row=row, col=col
         )
         # This year
         fig.add_trace(
-            go.Scatter(x=this_labels, y=this_cum, mode='lines+markers',
-                       name=f'{current_year}', line=dict(color=COLOR_THIS_YEAR, width=3),
-                       marker=dict(size=7), showlegend=(i == 0), legendgroup='this'),
+            go.Scattergl(x=this_labels, y=this_cum, mode='lines+markers',
+                         name=f'{current_year}', line=LINE_THIS_YEAR,
+                         marker=dict(size=7), showlegend=(i == 0), legendgroup='this'),
             row=row, col=col
         )
         # Benchmark
-        if benchmark_line:
+        if benchmark_line.size:
             fig.add_trace(
-                go.Scatter(x=this_labels, y=benchmark_line, mode='lines',
-                           name='10% Growth Target', line=dict(color=COLOR_BENCHMARK, width=2, dash='dash'),
-                           showlegend=(i == 0), legendgroup='bench'),
+                go.Scattergl(x=this_labels, y=benchmark_line, mode='lines',
+                             name='10% Growth Target', line=LINE_BENCHMARK,
+                             showlegend=(i == 0), legendgroup='bench'),
                 row=row, col=col
             )
 
@@ -793,42 +1148,44 @@ def create_progressive_attendance_charts(current_monthly_data, last_year_monthly
         this_data = (current_monthly_data or {}).get(group_name, {}) or {}
         last_data = (last_year_monthly_data or {}).get(group_name, {}) or {}
 
-        this_m, this_cum = create_cumulative_data(this_data, current_year)
-        last_m, last_cum = create_cumulative_data(last_data, last_year)
+        this_m, this_cum = create_cumulative_data(monthly_vector(this_data), current_year)
+        last_m, last_cum = create_cumulative_data(monthly_vector(last_data), last_year)
 
-        this_labels = [month_names[m - 1] for m in this_m]
-        last_labels = [month_names[m - 1] for m in last_m]
+        this_labels = [MONTH_NAMES[m - 1] for m in this_m]
+        last_labels = [MONTH_NAMES[m - 1] for m in last_m]
 
-        benchmark_target = (last_cum[-1] if last_cum else 0) * 1.10
-        benchmark_line = [(benchmark_target * (i + 1) / 12.0) for i in range(len(this_m))]
+        benchmark_target = (last_cum[-1] if last_cum.size else 0) * 1.10
+        benchmark_line = benchmark_target * np.arange(1, len(this_m) + 1) / 12.0
 
-        if last_cum:
+        if last_cum.size:
             fig.add_trace(
-                go.Scatter(x=last_labels, y=last_cum, mode='lines+markers',
-                           line=dict(color=COLOR_LAST_YEAR, width=3),
-                           marker=dict(size=6), showlegend=False, legendgroup='last'),
+                go.Scattergl(x=last_labels, y=last_cum, mode='lines+markers',
+                             line=LINE_LAST_YEAR,
+                             marker=dict(size=6), showlegend=False, legendgroup='last'),
                 row=row, col=col
             )
-        if this_cum:
+        if this_cum.size:
             fig.add_trace(
-                go.Scatter(x=this_labels, y=this_cum, mode='lines+markers',
-                           line=dict(color=COLOR_THIS_YEAR, width=3),
-                           marker=dict(size=6), showlegend=False, legendgroup='this'),
+                go.Scattergl(x=this_labels, y=this_cum, mode='lines+markers',
+                             line=LINE_THIS_YEAR,
+                             marker=dict(size=6), showlegend=False, legendgroup='this'),
                 row=row, col=col
             )
-        if benchmark_line and this_cum:
+        if benchmark_line.size and this_cum.size:
             fig.add_trace(
-                go.Scatter(x=this_labels, y=benchmark_line, mode='lines',
-                           line=dict(color=COLOR_BENCHMARK, width=2, dash='dash'),
-                           showlegend=False, legendgroup='bench'),
+                go.Scattergl(x=this_labels, y=benchmark_line, mode='lines',
+                             line=LINE_BENCHMARK,
+                             showlegend=False, legendgroup='bench'),
                 row=row, col=col
             )
 
-    # Axes labels
-    for r in range(1, rows + 1):
-        for c in range(1, cols + 1):
-            fig.update_yaxes(title_text="Cumulative Attendance", row=r, col=c, title_font_size=12)
-            fig.update_xaxes(title_text="Month", row=r, col=c, title_font_size=12)
+    # Axes labels - one layout update instead of two per subplot
+    axis_updates = {}
+    for k in range(1, rows * cols + 1):
+        suffix = '' if k == 1 else str(k)
+        axis_updates[f'xaxis{suffix}'] = XAXIS_STYLE
+        axis_updates[f'yaxis{suffix}'] = YAXIS_STYLE
+    fig.update_layout(**axis_updates)
 
     # Portrait-ish proportions
     width = 1800
@@ -843,36 +1200,29 @@ def create_progressive_attendance_charts(current_monthly_data, last_year_monthly
         legend=dict(orientation="h", yanchor="bottom", y=1.03, xanchor="center", x=0.5)
     )
 
-    # Save both HTML and PNG to outputs directory
-    html_name = os.path.join(outputs_dir, 'bible_study_progressive_attendance.html')
-    png_name = os.path.join(outputs_dir, 'bible_study_progressive_attendance.png')
+    def save_and_open(png_future=None):
+        # HTML is always written; the PNG is only rendered when requested (--png)
+        output_path = _save_figure(fig, base_path, width, height, want_png=EXPORT_PNG, png_future=png_future)
+        if not output_path:
+            return
 
-    try:
-        fig.write_html(html_name)
-        print(f"✅ Saved HTML: {os.path.abspath(html_name)}")
-    except Exception as e:
-        print(f"⚠️ Could not save HTML: {e}")
+        if output_path.endswith(expected_output):
+            try:
+                with open(key_file, 'w') as f:
+                    f.write(render_key)
+            except OSError as e:
+                print(f"⚠️ Could not record chart data hash: {e}")
 
-    # PNG requires kaleido
-    try:
-        fig.write_image(png_name, width=width, height=height, scale=2)
-        png_path = os.path.abspath(png_name)
-        print(f"✅ Saved PNG: {png_path}")
+        _open_chart(output_path)
 
-        # Auto-open the PNG (cross-platform)
-        try:
-            if sys.platform.startswith('darwin'):
-                subprocess.Popen(['open', png_path])
-            elif os.name == 'nt':
-                os.startfile(png_path)
-            else:
-                subprocess.Popen(['xdg-open', png_path])
-            print("✅ PNG auto-opened.")
-        except Exception as e:
-            print(f"⚠️ PNG saved but could not auto-open: {e}")
-            print(f"   Please open manually: {png_path}")
-    except Exception as e:
-        print(f"❌ PNG save failed (is 'kaleido' installed?): {e}")
+    if EXPORT_PNG:
+        # Kaleido rasterization takes seconds; let it overlap the rest of the analysis.
+        # The worker only renders bytes, so nothing it does is printed mid-step.
+        pool = ThreadPoolExecutor(max_workers=1)
+        png_future = pool.submit(_render_png, fig, width, height)
+        pool.shutdown(wait=False)
+        return lambda: save_and_open(png_future)
+    save_and_open()
 
 
 def create_charts(follow_up_this_year, follow_up_last_year, current_year, last_year):
@@ -940,7 +1290,6 @@ def create_charts(follow_up_this_year, follow_up_last_year, current_year, last_y
     fig.update_yaxes(title_text="Number of People", row=1, col=2)
     
     # Save to outputs directory
-    import os
     outputs_dir = 'outputs'
     os.makedirs(outputs_dir, exist_ok=True)
     
@@ -953,29 +1302,28 @@ def create_charts(follow_up_this_year, follow_up_last_year, current_year, last_y
     except Exception as e:
         print(f"⚠️ Could not save HTML: {e}")
     
+    if not EXPORT_PNG:
+        return
+
     try:
-        fig.write_image(png_filename, width=1400, height=600, scale=2)
+        png_bytes = _render_png(fig, 1400, 600)
+        with open(png_filename, 'wb') as f:
+            f.write(png_bytes)
         print(f"✅ PNG saved: {png_filename}")
     except Exception as e:
         print(f"⚠️ PNG save failed: {e}")
 
 
-def create_followup_member_list(follow_up_recent_missed, follow_up_this_year, follow_up_last_year, current_year, last_year, serving_members_not_in_groups=None):
-    """Create detailed HTML report of members needing follow-up, plus serving members not in any Bible Study group"""
-    
-    print("Creating member list with data:")
-    print(f"   Recent missed follow-ups: {sum(len(members) for members in follow_up_recent_missed.values()) if follow_up_recent_missed else 0}")
-    print(f"   This year follow-ups: {sum(len(members) for members in follow_up_this_year.values()) if follow_up_this_year else 0}")
-    print(f"   Last year follow-ups: {sum(len(members) for members in follow_up_last_year.values()) if follow_up_last_year else 0}")
-    
-    html_content = f"""<!DOCTYPE html>
+# Follow-up member list templates, compiled once at import. string.Template uses $name
+# placeholders, so the CSS braces need no escaping.
+_HTML_HEAD_TEMPLATE = Template("""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Bible Study Follow-up List - Calendar Years {last_year} & {current_year}</title>
+    <title>Bible Study Follow-up List - Calendar Years $last_year & $current_year</title>
     <style>
-        body {{
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
             background: #f5f7fa;
             color: #2c3e50;
@@ -983,196 +1331,232 @@ def create_followup_member_list(follow_up_recent_missed, follow_up_this_year, fo
             padding: 20px;
             line-height: 1.5;
             font-size: 12px;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 1000px;
             margin: 0 auto;
             background: white;
             border-radius: 8px;
             box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
+        }
         
-        .header {{
+        .header {
             background: linear-gradient(135deg, #5e72e4 0%, #825ee4 100%);
             color: white;
             padding: 20px;
             border-radius: 8px 8px 0 0;
             text-align: center;
-        }}
+        }
         
-        .header h1 {{
+        .header h1 {
             font-size: 1.5rem;
             font-weight: 600;
             margin: 0 0 5px 0;
-        }}
+        }
         
-        .header p {{
+        .header p {
             margin: 0;
             font-size: 0.9rem;
             opacity: 0.95;
-        }}
+        }
         
-        .summary {{
+        .summary {
             padding: 20px;
             background: #f8fafb;
             border-bottom: 1px solid #e1e8ed;
-        }}
+        }
         
-        .summary h2 {{
+        .summary h2 {
             color: #2c3e50;
             margin: 0 0 12px 0;
             font-size: 1.1rem;
             font-weight: 600;
-        }}
+        }
         
-        .summary p {{
+        .summary p {
             margin: 0 0 8px 0;
             font-size: 0.9rem;
             color: #546e7a;
-        }}
+        }
         
-        .summary-stats {{
+        .summary-stats {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
             gap: 12px;
             margin-top: 12px;
-        }}
+        }
         
-        .stat-card {{
+        .stat-card {
             background: white;
             padding: 12px;
             border-radius: 6px;
             text-align: center;
             border: 1px solid #e1e8ed;
-        }}
+        }
         
-        .stat-number {{
+        .stat-number {
             font-size: 1.8rem;
             font-weight: bold;
             color: #5e72e4;
-        }}
+        }
         
-        .stat-label {{
+        .stat-label {
             color: #78909c;
             font-size: 0.85rem;
             margin-top: 4px;
-        }}
+        }
         
-        .section-title {{
+        .section-title {
             background: #5e72e4;
             color: white;
             padding: 10px 20px;
             font-size: 1rem;
             font-weight: 600;
             margin: 0;
-        }}
+        }
         
-        .section-title.urgent {{
+        .section-title.urgent {
             background: #ff9800;
-        }}
+        }
         
-        .section-title.priority {{
+        .section-title.priority {
             background: #ffa726;
-        }}
+        }
         
-        .section-title.last-year {{
+        .section-title.last-year {
             background: #42a5f5;
-        }}
+        }
         
-        .urgent-note {{
+        .urgent-note {
             background: #fff3e0;
             border-left: 4px solid #ff9800;
             padding: 12px;
             margin: 0;
             font-size: 0.9rem;
             color: #e65100;
-        }}
+        }
         
-        .group-section {{
+        .group-section {
             border-bottom: 1px solid #e1e8ed;
-        }}
+        }
         
-        .group-title {{
+        .group-title {
             background: #f8fafb;
             padding: 10px 20px;
             font-weight: 600;
             color: #2c3e50;
             font-size: 0.95rem;
-        }}
+        }
         
-        .member-list {{
+        .member-list {
             padding: 0;
-        }}
+        }
         
-        .member-card {{
+        .member-card {
             padding: 10px 20px;
             border-bottom: 1px solid #f0f3f5;
             display: flex;
             justify-content: space-between;
             align-items: center;
-        }}
+        }
         
-        .member-card:hover {{
+        .member-card:hover {
             background: #f8fafb;
-        }}
+        }
         
-        .member-card:last-child {{
+        .member-card:last-child {
             border-bottom: none;
-        }}
+        }
         
-        .member-name {{
+        .member-name {
             font-weight: 500;
             color: #2c3e50;
             font-size: 0.95rem;
-        }}
+        }
         
-        .member-info {{
+        .member-info {
             font-size: 0.85rem;
             color: #78909c;
-        }}
+        }
         
-        .no-followup {{
+        .no-followup {
             padding: 20px;
             text-align: center;
             color: #4caf50;
             font-weight: 500;
-        }}
+        }
         
-        .footer {{
+        .footer {
             padding: 15px 20px;
             text-align: center;
             color: #90a4ae;
             font-size: 0.75rem;
             border-top: 1px solid #e1e8ed;
-        }}
+        }
         
-        @media print {{
-            body {{
+        @media print {
+            body {
                 background: white;
                 font-size: 10px;
-            }}
-            .container {{
+            }
+            .container {
                 box-shadow: none;
-            }}
-        }}
+            }
+        }
     </style>
 </head>
 <body>
     <div class="container">
         <div class="header">
             <h1>📚 Bible Study Follow-up List</h1>
-            <p>Calendar Years {last_year} & {current_year}</p>
+            <p>Calendar Years $last_year & $current_year</p>
+        </div>
+""")
+
+_GROUP_SECTION_OPEN = Template("""
+        <div class="group-section">
+            <div class="group-title">
+                $group_name ($count people)
+            </div>
+            <div class="member-list">
+""")
+
+_MEMBER_CARD = Template("""
+                <div class="member-card">
+                    <div class="member-name">$name$role_display</div>
+                    <div class="member-info">Last attended: $last_attended</div>
+                </div>
+""")
+
+_GROUP_SECTION_CLOSE = """
+            </div>
         </div>
 """
+
+
+def _count_members(follow_up):
+    """Total members across a {group: [members]} follow-up dict (None/empty -> 0)"""
+    return sum(map(len, follow_up.values())) if follow_up else 0
+
+
+def create_followup_member_list(follow_up_recent_missed, follow_up_this_year, follow_up_last_year, current_year, last_year, serving_members_not_in_groups=None):
+    """Create detailed HTML report of members needing follow-up, plus serving members not in any Bible Study group"""
     
-    # Calculate summary statistics
-    total_recent_missed = sum(len(members) for members in follow_up_recent_missed.values()) if follow_up_recent_missed else 0
-    total_this_year = sum(len(members) for members in follow_up_this_year.values()) if follow_up_this_year else 0
-    total_last_year = sum(len(members) for members in follow_up_last_year.values()) if follow_up_last_year else 0
+    # Calculate summary statistics once; used by the log lines, the summary cards and the PNG height
+    total_recent_missed = _count_members(follow_up_recent_missed)
+    total_this_year = _count_members(follow_up_this_year)
+    total_last_year = _count_members(follow_up_last_year)
+
+    print("Creating member list with data:")
+    print(f"   Recent missed follow-ups: {total_recent_missed}")
+    print(f"   This year follow-ups: {total_this_year}")
+    print(f"   Last year follow-ups: {total_last_year}")
+    
+    parts = [_HTML_HEAD_TEMPLATE.substitute(last_year=last_year, current_year=current_year)]
     
     # Add summary section
-    html_content += f"""
+    parts.append(f"""
         <div class="summary">
             <h2>📊 Summary</h2>
             <p>Analysis of Bible Study Group members requiring follow-up based on attendance patterns.</p>
@@ -1196,122 +1580,80 @@ def create_followup_member_list(follow_up_recent_missed, follow_up_this_year, fo
                 </div>
             </div>
         </div>
-"""
+""")
     
     # URGENT SECTION - MISSED LAST 3 MEETINGS
-    html_content += f"""
+    parts.append(f"""
         <div class="section-title urgent">
             🚨 URGENT: Missed Last 3 Meetings ({current_year})
         </div>
-"""
+""")
     
     if follow_up_recent_missed:
-        html_content += """
+        parts.append("""
         <div class="urgent-note">
             <strong>⚠️ IMMEDIATE FOLLOW-UP REQUIRED:</strong> These members have missed their group's last 3 meetings this calendar year and need urgent pastoral contact.
         </div>
-"""
+""")
         
         for group_name, members in follow_up_recent_missed.items():
-            html_content += f"""
-        <div class="group-section">
-            <div class="group-title">
-                {group_name} ({len(members)} people)
-            </div>
-            <div class="member-list">
-"""
+            parts.append(_GROUP_SECTION_OPEN.substitute(group_name=group_name, count=len(members)))
             
             for member in members:
                 role_display = f" • {member['role']}" if member.get('role') else ""
                 last_attended = member.get('last_attended', 'Unknown')
                 
-                html_content += f"""
-                <div class="member-card">
-                    <div class="member-name">{member['name']}{role_display}</div>
-                    <div class="member-info">Last attended: {last_attended}</div>
-                </div>
-"""
+                parts.append(_MEMBER_CARD.substitute(name=member['name'], role_display=role_display, last_attended=last_attended))
             
-            html_content += """
-            </div>
-        </div>
-"""
+            parts.append(_GROUP_SECTION_CLOSE)
     else:
-        html_content += f'<div class="no-followup">✅ Excellent! No members missed the last 3 meetings in {current_year}!</div>'
+        parts.append(f'<div class="no-followup">✅ Excellent! No members missed the last 3 meetings in {current_year}!</div>')
     
     # THIS CALENDAR YEAR SECTION
-    html_content += f"""
+    parts.append(f"""
         <div class="section-title priority">
             PRIORITY: Has Not Attended Group in {current_year}
         </div>
-"""
+""")
     
     if follow_up_this_year:
         for group_name, members in follow_up_this_year.items():
-            html_content += f"""
-        <div class="group-section">
-            <div class="group-title">
-                {group_name} ({len(members)} people)
-            </div>
-            <div class="member-list">
-"""
+            parts.append(_GROUP_SECTION_OPEN.substitute(group_name=group_name, count=len(members)))
             
             for member in members:
                 role_display = f" • {member['role']}" if member.get('role') else ""
                 last_attended = member.get('last_attended', f'Not in {current_year}')
                 
-                html_content += f"""
-                <div class="member-card">
-                    <div class="member-name">{member['name']}{role_display}</div>
-                    <div class="member-info">Last attended: {last_attended}</div>
-                </div>
-"""
+                parts.append(_MEMBER_CARD.substitute(name=member['name'], role_display=role_display, last_attended=last_attended))
             
-            html_content += """
-            </div>
-        </div>
-"""
+            parts.append(_GROUP_SECTION_CLOSE)
     else:
-        html_content += f'<div class="no-followup">✅ All members attended at least once in {current_year}!</div>'
+        parts.append(f'<div class="no-followup">✅ All members attended at least once in {current_year}!</div>')
     
     # LAST CALENDAR YEAR SECTION
-    html_content += f"""
+    parts.append(f"""
         <div class="section-title last-year">
             Did Not Attend Group in {last_year}
         </div>
-"""
+""")
     
     if follow_up_last_year:
         for group_name, members in follow_up_last_year.items():
-            html_content += f"""
-        <div class="group-section">
-            <div class="group-title">
-                {group_name} ({len(members)} people)
-            </div>
-            <div class="member-list">
-"""
+            parts.append(_GROUP_SECTION_OPEN.substitute(group_name=group_name, count=len(members)))
             
             for member in members:
                 role_display = f" • {member['role']}" if member.get('role') else ""
                 last_attended = member.get('last_attended', f'Not in {last_year}')
                 
-                html_content += f"""
-                <div class="member-card">
-                    <div class="member-name">{member['name']}{role_display}</div>
-                    <div class="member-info">Last attended: {last_attended}</div>
-                </div>
-"""
+                parts.append(_MEMBER_CARD.substitute(name=member['name'], role_display=role_display, last_attended=last_attended))
             
-            html_content += """
-            </div>
-        </div>
-"""
+            parts.append(_GROUP_SECTION_CLOSE)
     else:
-        html_content += f'<div class="no-followup">✅ All members attended at least once in {last_year}!</div>'
+        parts.append(f'<div class="no-followup">✅ All members attended at least once in {last_year}!</div>')
 
     # Add section for Serving Members not in any Small Group
     if serving_members_not_in_groups and len(serving_members_not_in_groups) > 0:
-        html_content += f"""
+        parts.append(f"""
         <div class="section-title" style="margin-top: 30px; background: #f59e0b;">
             📋 Serving Members Not in Any Small Group
         </div>
@@ -1325,7 +1667,7 @@ def create_followup_member_list(follow_up_recent_missed, follow_up_this_year, fo
                 Serving Members Not in Any Small Group ({len(serving_members_not_in_groups)} people)
             </div>
             <div class="member-list">
-"""
+""")
         # Sort by last name
         sorted_members = sorted(serving_members_not_in_groups, key=lambda x: (x['last_name'], x['first_name']))
 
@@ -1337,60 +1679,65 @@ def create_followup_member_list(follow_up_recent_missed, follow_up_this_year, fo
                 contact_parts.append(f"📞 {member['phone']}")
             contact_info = " | ".join(contact_parts) if contact_parts else "No contact info"
 
-            html_content += f"""
+            parts.append(f"""
                 <div class="member-item">
                     <div class="member-name">{member['name']}</div>
                     <div class="member-info">{contact_info}</div>
                 </div>
-"""
+""")
 
-        html_content += """
+        parts.append("""
             </div>
         </div>
-"""
+""")
 
-    html_content += f"""
+    parts.append(f"""
         <div class="footer">
             <p>Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
         </div>
     </div>
 </body>
 </html>
-"""
+""")
     
     # Save to outputs directory
-    import os
-    import shutil
     outputs_dir = 'outputs'
     os.makedirs(outputs_dir, exist_ok=True)
     
     html_filename = 'bible_study_followup_members.html'
     html_filepath = os.path.join(outputs_dir, html_filename)
     
-    # Save HTML
-    with open(html_filepath, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # Save HTML - stream the fragments straight out rather than joining one big string first
+    with open(html_filepath, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.writelines(parts)
 
     print(f"✅ Dashboard saved: {html_filepath}")
 
     # Auto-open HTML file
     try:
-        import subprocess
-        import webbrowser
         webbrowser.open(f"file://{os.path.abspath(html_filepath)}")
         print("✅ HTML file auto-opened in browser.")
     except Exception as e:
         print(f"⚠️ HTML saved but could not auto-open: {e}")
         print(f"   Please open manually: {html_filepath}")
 
+    if not EXPORT_PNG:
+        return html_filepath
+
     # Generate PNG image using html2image (same as using_gifts_dashboard.py)
     print("🖼️ Generating PNG image...")
+    html_content = ''.join(parts)
+    png_filename = 'bible_study_followup_members.png'
+    png_filepath = os.path.join(outputs_dir, png_filename)
+
+    if Html2Image is None:
+        print("⚠️ PNG generation skipped - install html2image")
+        print(f"   HTML file is available: {html_filepath}")
+        return html_filepath
+
     try:
-        from html2image import Html2Image
-        hti = Html2Image()
-        
-        png_filename = 'bible_study_followup_members.png'
-        png_filepath = os.path.join(outputs_dir, png_filename)
+        # Write straight into outputs/ instead of the working directory
+        hti = Html2Image(output_path=outputs_dir)
         
         # Calculate approximate height based on content
         # Estimate: header ~200px, summary ~300px, each member ~80px, footer ~100px
@@ -1399,16 +1746,14 @@ def create_followup_member_list(follow_up_recent_missed, follow_up_this_year, fo
         # Add padding and ensure minimum height
         estimated_height = max(2000, min(estimated_height + 500, 15000))
 
-        # Generate PNG from HTML file with dynamic height
+        # Render from the in-memory HTML with dynamic height
         hti.screenshot(
-            html_file=html_filepath,
+            html_str=html_content,
             save_as=png_filename,
             size=(1200, estimated_height)  # Dynamic height to capture all content
         )
         
-        # html2image saves in current directory, so move it to outputs
-        if os.path.exists(png_filename):
-            shutil.move(png_filename, png_filepath)
+        if os.path.exists(png_filepath):
             print(f"✅ PNG image saved: {png_filepath}")
             print(f"📁 Both files ready in the '{outputs_dir}' directory!")
         else:
@@ -1423,18 +1768,12 @@ def create_followup_member_list(follow_up_recent_missed, follow_up_this_year, fo
 
 def cleanup_old_files():
     """Remove any existing Bible study report files to ensure fresh generation"""
-    import os
-    import glob
     
-    # Find all existing Bible study HTML files
-    patterns = [
-        "bible_study_followup_*.html",
-        "bible_study_progressive_*.html"
-    ]
-    
-    all_existing_files = []
-    for pattern in patterns:
-        all_existing_files.extend(glob.glob(pattern))
+    # Find all existing Bible study HTML files in one directory pass
+    prefixes = ("bible_study_followup_", "bible_study_progressive_")
+    with os.scandir('.') as entries:
+        all_existing_files = [entry.name for entry in entries
+                              if entry.name.endswith('.html') and entry.name.startswith(prefixes) and entry.is_file()]
     
     if all_existing_files:
         print(f"Cleaning up {len(all_existing_files)} existing report files...")
@@ -1458,7 +1797,7 @@ def create_bible_study_attendance_analysis():
     print(f"This Calendar Year: {current_year}")
     print(f"Last Calendar Year: {last_year}")
     print(f"Two Years Ago: {two_years_ago}")
-    print("=" * 80)
+    print(_BANNER)
 
     # Clean up any existing files first
     print("\nCleaning up existing files...")
@@ -1470,7 +1809,8 @@ def create_bible_study_attendance_analysis():
 
     # Step 1: Find all three attendance report groups
     print("\nStep 1: Finding calendar year attendance report groups...")
-    current_year_group, last_year_group, two_years_ago_group = find_attendance_report_groups()
+    # One paginated group scan serves both the report lookup and Step 4
+    current_year_group, last_year_group, two_years_ago_group = find_attendance_report_groups(fetch_all_groups_from_api())
 
     if not current_year_group:
         print("No current year 'Individual Group Attendance' report group found")
@@ -1480,44 +1820,45 @@ def create_bible_study_attendance_analysis():
 
     # Step 2: Download attendance data from all available groups
     print("\nStep 2: Downloading attendance data from groups...")
-    current_year_data = download_group_attendance_data(current_year_group)
+    # The three reports are independent, so fetch them side by side
+    # (a missing group downloads as None)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        current_year_data, last_year_data, two_years_ago_data = pool.map(
+            download_group_attendance_data, (current_year_group, last_year_group, two_years_ago_group))
 
-    if not current_year_data:
+    if current_year_data is None:
         print("Failed to download current year attendance data")
         return None
 
-    # Download last year data if available
-    last_year_data = None
     if last_year_group:
-        last_year_data = download_group_attendance_data(last_year_group)
         print("Downloaded last year attendance data")
     else:
         print("No last year report group found")
 
-    # Download two years ago data if available
-    two_years_ago_data = None
     if two_years_ago_group:
-        two_years_ago_data = download_group_attendance_data(two_years_ago_group)
         print("Downloaded two years ago attendance data")
     else:
         print("No two years ago report group found")
 
     # Step 3: Extract attendance data (incl. recent missed)
-    current_attendance_data = extract_groups_from_attendance_data(current_year_data)
-    current_monthly_data = extract_monthly_attendance_data(current_year_data, "Current Year")
+    # Each report's header is parsed once and shared by both extractors
+    current_header = parse_report_header(current_year_data)
+    current_attendance_data = extract_groups_from_attendance_data(current_year_data, current_header)
+    current_monthly_data = extract_monthly_attendance_data(current_year_data, "Current Year", current_header)
 
     if not current_attendance_data:
         print("No attendance data extracted from current year report")
         return None
 
-    if last_year_data:
-        last_year_attendance_data = extract_groups_from_attendance_data(last_year_data)
-        last_year_monthly_data = extract_monthly_attendance_data(last_year_data, "Last Year")
+    if last_year_data is not None:
+        last_year_header = parse_report_header(last_year_data)
+        last_year_attendance_data = extract_groups_from_attendance_data(last_year_data, last_year_header)
+        last_year_monthly_data = extract_monthly_attendance_data(last_year_data, "Last Year", last_year_header)
     else:
         last_year_attendance_data = {}
         last_year_monthly_data = {}
 
-    if two_years_ago_data:
+    if two_years_ago_data is not None:
         two_years_ago_attendance_data = extract_groups_from_attendance_data(two_years_ago_data)
     else:
         two_years_ago_attendance_data = {}
@@ -1567,76 +1908,56 @@ def create_bible_study_attendance_analysis():
 
     # Step 6: Analyze attendance patterns
     print("\nStep 6: Analyzing attendance patterns...")
-    all_attendance_data = {}
-    
-    # Combine all three years of data
-    for group_name, group_info in current_attendance_data.items():
-        if group_name not in all_attendance_data:
-            all_attendance_data[group_name] = {
-                'this_year_attendees': [], 'this_year_all_people': [],
-                'this_year_recent_missed': [], 'this_year_member_last_attended': {},
-                'last_year_attendees': [], 'last_year_all_people': [],
-                'last_year_member_last_attended': {},
-                'two_years_ago_member_last_attended': {}
-            }
-        all_attendance_data[group_name]['this_year_attendees'] = group_info.get('attendees', [])
-        all_attendance_data[group_name]['this_year_all_people'] = group_info.get('all_people', [])
-        all_attendance_data[group_name]['this_year_recent_missed'] = group_info.get('recent_missed', [])
-        all_attendance_data[group_name]['this_year_member_last_attended'] = group_info.get('member_last_attended', {})
-
-    for group_name, group_info in last_year_attendance_data.items():
-        if group_name not in all_attendance_data:
-            all_attendance_data[group_name] = {
-                'this_year_attendees': [], 'this_year_all_people': [],
-                'this_year_recent_missed': [], 'this_year_member_last_attended': {},
-                'last_year_attendees': [], 'last_year_all_people': [],
-                'last_year_member_last_attended': {},
-                'two_years_ago_member_last_attended': {}
-            }
-        all_attendance_data[group_name]['last_year_attendees'] = group_info.get('attendees', [])
-        all_attendance_data[group_name]['last_year_all_people'] = group_info.get('all_people', [])
-        all_attendance_data[group_name]['last_year_member_last_attended'] = group_info.get('member_last_attended', {})
-
-    for group_name, group_info in two_years_ago_attendance_data.items():
-        if group_name not in all_attendance_data:
-            all_attendance_data[group_name] = {
-                'this_year_attendees': [], 'this_year_all_people': [],
-                'this_year_recent_missed': [], 'this_year_member_last_attended': {},
-                'last_year_attendees': [], 'last_year_all_people': [],
-                'last_year_member_last_attended': {},
-                'two_years_ago_member_last_attended': {}
-            }
-        all_attendance_data[group_name]['two_years_ago_member_last_attended'] = group_info.get('member_last_attended', {})
+    all_attendance_data = defaultdict(lambda: {
+        'this_year_attendees': [], 'this_year_all_people': [],
+        'this_year_recent_missed': [], 'this_year_member_last_attended': {},
+        'last_year_attendees': [], 'last_year_all_people': [],
+        'last_year_member_last_attended': {},
+        'two_years_ago_member_last_attended': {}
+    })
+
+    # Combine all three years of data in one pass; each year only fills its own keys
+    year_sources = (
+        (current_attendance_data, 'this_year', ('attendees', 'all_people', 'recent_missed')),
+        (last_year_attendance_data, 'last_year', ('attendees', 'all_people')),
+        (two_years_ago_attendance_data, 'two_years_ago', ()),
+    )
+    for source, prefix, list_fields in year_sources:
+        for group_name, group_info in source.items():
+            merged = all_attendance_data[group_name]
+            for field in list_fields:
+                merged[f'{prefix}_{field}'] = group_info.get(field, [])
+            merged[f'{prefix}_member_last_attended'] = group_info.get('member_last_attended', {})
+    all_attendance_data = dict(all_attendance_data)
 
     print("\nDEBUG: Available attendance group names:")
     for group_name in sorted(all_attendance_data.keys()):
         print(f"   '{group_name}'")
 
+    # Index a {name: last attended date} dict by normalized name (first match wins)
+    def index_by_normalized_name(last_attended):
+        index = {}
+        for name, date in last_attended.items():
+            index.setdefault(normalize_name(name), date)
+        return index
+
     # Helper function to find last attended date across all years
-    def get_last_attended_date(member_name, group_attendance_data):
+    def get_last_attended_date(member_norm, last_attended_by_year):
         """
         Find the most recent attendance date for a member across all three years.
-        Returns: date string like "08/03" or None
+        last_attended_by_year is ((index, year), ...) ordered newest first.
+        Returns: date string like "08/03 (2025)" or None
         """
-        member_norm = normalize_name(member_name)
-        
-        # Check current year first
-        for name, date in group_attendance_data.get('this_year_member_last_attended', {}).items():
-            if normalize_name(name) == member_norm:
-                return f"{date} ({current_year})"
-        
-        # Check last year
-        for name, date in group_attendance_data.get('last_year_member_last_attended', {}).items():
-            if normalize_name(name) == member_norm:
-                return f"{date} ({last_year})"
-        
-        # Check two years ago
-        for name, date in group_attendance_data.get('two_years_ago_member_last_attended', {}).items():
-            if normalize_name(name) == member_norm:
-                return f"{date} ({two_years_ago})"
-        
+        for index, year in last_attended_by_year:
+            if member_norm in index:
+                return f"{index[member_norm]} ({year})"
         return None
 
+    # Normalized attendance group name -> merged data (first name wins, as in the old scan)
+    attendance_by_norm = {}
+    for attendance_group_name, attendance in all_attendance_data.items():
+        attendance_by_norm.setdefault(normalize_name(attendance_group_name), attendance)
+
     follow_up_this_year = {}
     follow_up_last_year = {}
     follow_up_recent_missed = {}
@@ -1644,19 +1965,15 @@ def create_bible_study_attendance_analysis():
     for api_group_name, members in bible_study_members.items():
         print(f"\n   Analyzing {api_group_name}:")
         print(f"      Total members from API: {len(members)}")
-        matching_attendance = None
 
-        # Exact match and partial fallbacks
-        for attendance_group_name in all_attendance_data.keys():
-            if normalize_name(api_group_name) == normalize_name(attendance_group_name):
-                matching_attendance = all_attendance_data[attendance_group_name]
-                break
+        # Exact match via the normalized index, then partial fallbacks
+        api_n = normalize_name(api_group_name)
+        matching_attendance = attendance_by_norm.get(api_n)
         if not matching_attendance:
-            for attendance_group_name in all_attendance_data.keys():
-                api_n = normalize_name(api_group_name)
-                att_n = normalize_name(attendance_group_name)
-                if (api_n in att_n) or (att_n in api_n) or any(w in att_n for w in api_n.split() if len(w) > 3):
-                    matching_attendance = all_attendance_data[attendance_group_name]
+            api_words = [w for w in api_n.split() if len(w) > 3]
+            for att_n, attendance in attendance_by_norm.items():
+                if (api_n in att_n) or (att_n in api_n) or any(w in att_n for w in api_words):
+                    matching_attendance = attendance
                     break
 
         if not matching_attendance:
@@ -1669,6 +1986,22 @@ def create_bible_study_attendance_analysis():
         last_year_attendees = matching_attendance.get('last_year_attendees', [])
         last_year_all_people = matching_attendance.get('last_year_all_people', [])
 
+        # Normalized-name sets/indexes for this group, so each member check is a hash lookup
+        this_year_attendees_set = frozenset(map(normalize_name, this_year_attendees))
+        this_year_all_set = frozenset(map(normalize_name, this_year_all_people))
+        recent_missed_set = frozenset(map(normalize_name, this_year_recent_missed))
+        last_year_attendees_set = frozenset(map(normalize_name, last_year_attendees))
+        last_year_all_set = frozenset(map(normalize_name, last_year_all_people))
+        # Resolve "on the roll but never attended" as set differences once per group (anti-join),
+        # so each member needs a single membership test per category
+        absent_this_year_set = this_year_all_set - this_year_attendees_set
+        absent_last_year_set = last_year_all_set - last_year_attendees_set
+        last_attended_by_year = (
+            (index_by_normalized_name(matching_attendance.get('this_year_member_last_attended', {})), current_year),
+            (index_by_normalized_name(matching_attendance.get('last_year_member_last_attended', {})), last_year),
+            (index_by_normalized_name(matching_attendance.get('two_years_ago_member_last_attended', {})), two_years_ago),
+        )
+
         print(f"      This calendar year: {len(this_year_attendees)} / {len(this_year_all_people)} attended")
         print(f"      Recent missed (last 3): {len(this_year_recent_missed)}")
         print(f"      Last calendar year: {len(last_year_attendees)} / {len(last_year_all_people)} attended")
@@ -1681,34 +2014,26 @@ def create_bible_study_attendance_analysis():
             member_name = member['name']
             member_norm = normalize_name(member_name)
 
-            # Check if missed recent meetings
-            missed_recent = any(normalize_name(p) == member_norm for p in this_year_recent_missed)
+            missed_recent = member_norm in recent_missed_set
+            absent_this_year = member_norm in absent_this_year_set
+            absent_last_year = member_norm in absent_last_year_set
+            if not (missed_recent or absent_this_year or absent_last_year):
+                continue
+
+            # Create the enriched member dict (with last attended date) once; the
+            # follow-up lists only read it, so every category can share it
+            last_attended = get_last_attended_date(member_norm, last_attended_by_year)
+            enriched_member = {**member, 'last_attended': last_attended or f'Not since before {two_years_ago}'}
+
+            # Missed recent meetings
             if missed_recent:
-                # Create enriched member dict with last attended date
-                enriched_member = member.copy()
-                last_attended = get_last_attended_date(member_name, matching_attendance)
-                enriched_member['last_attended'] = last_attended if last_attended else f'Not since before {two_years_ago}'
                 group_followup_recent_missed.append(enriched_member)
-
-            # Check if appears but didn't attend this year
-            appears_this_year = any(normalize_name(p) == member_norm for p in this_year_all_people)
-            if appears_this_year:
-                attended_this_year = any(normalize_name(p) == member_norm for p in this_year_attendees)
-                if not attended_this_year:
-                    enriched_member = member.copy()
-                    last_attended = get_last_attended_date(member_name, matching_attendance)
-                    enriched_member['last_attended'] = last_attended if last_attended else f'Not since before {two_years_ago}'
-                    group_followup_this_year.append(enriched_member)
-
-            # Check if appears but didn't attend last year
-            appears_last_year = any(normalize_name(p) == member_norm for p in last_year_all_people)
-            if appears_last_year:
-                attended_last_year = any(normalize_name(p) == member_norm for p in last_year_attendees)
-                if not attended_last_year:
-                    enriched_member = member.copy()
-                    last_attended = get_last_attended_date(member_name, matching_attendance)
-                    enriched_member['last_attended'] = last_attended if last_attended else f'Not since before {two_years_ago}'
-                    group_followup_last_year.append(enriched_member)
+            # Appears but didn't attend this year
+            if absent_this_year:
+                group_followup_this_year.append(enriched_member)
+            # Appears but didn't attend last year
+            if absent_last_year:
+                group_followup_last_year.append(enriched_member)
 
         if group_followup_recent_missed:
             follow_up_recent_missed[api_group_name] = group_followup_recent_missed
@@ -1720,138 +2045,167 @@ def create_bible_study_attendance_analysis():
     print("\nStep 7: Creating visualizations...")
     # create_charts(follow_up_this_year, follow_up_last_year, current_year, last_year)  # REMOVED - not needed
 
-    # Step 7b: create the 3-across PNG grid for the per-group progressive charts
-    print("\nStep 7b: Creating progressive monthly attendance grid (PNG)...")
-    create_progressive_attendance_charts(current_monthly_data, last_year_monthly_data, current_year, last_year)
+    # Step 7b: create the 3-across grid for the per-group progressive charts
+    print("\nStep 7b: Creating progressive monthly attendance grid...")
+    finish_chart = create_progressive_attendance_charts(current_monthly_data, last_year_monthly_data, current_year, last_year)
 
-    # Step 7c: Find Serving Members (RosteredMember_) not in any Small Group
-    print("\nStep 7c: Identifying Serving Members not in any Small Group...")
-    rostered_members = fetch_rostered_members()
-
-    # Get all people who are in small groups (Bible Study, Kids Club, Youth Group, IFF)
-    small_group_list = [g for g in all_groups if is_small_group(g)]
-    print(f"   Found {len(small_group_list)} small groups (Bible Study, Kids Club, Youth Group, IFF)")
+    try:
+        # Step 7c: Find Serving Members (RosteredMember_) not in any Small Group
+        print("\nStep 7c: Identifying Serving Members not in any Small Group...")
+        rostered_members = fetch_rostered_members()
 
-    all_small_group_members = set()
+        # Get all people who are in small groups (Bible Study, Kids Club, Youth Group, IFF)
+        small_group_list = [g for g in all_groups if is_small_group(g)]
+        print(f"   Found {len(small_group_list)} small groups (Bible Study, Kids Club, Youth Group, IFF)")
 
-    # Add Bible Study group members
-    for group_name, members in bible_study_members.items():
-        for member in members:
-            all_small_group_members.add(normalize_name(member['name']))
+        all_small_group_members = set()
 
-    # Add members from Kids Club, Youth Group, IFF
-    for group in small_group_list:
-        group_name = group.get('name', '').lower()
-        # Skip if it's already counted as a Bible Study group
-        if is_bible_study_group(group):
-            continue
+        # Add Bible Study group members
+        for group_name, members in bible_study_members.items():
+            for member in members:
+                all_small_group_members.add(normalize_name(member['name']))
 
         # Add members from Kids Club, Youth Group, IFF
-        if group.get('people') and group['people'].get('person'):
-            group_people = group['people']['person']
-            if not isinstance(group_people, list):
-                group_people = [group_people] if group_people else []
-
-            for person in group_people:
-                first_name = (person.get('firstname') or '').strip()
-                last_name = (person.get('lastname') or '').strip()
-                person_name = f"{first_name} {last_name}".strip()
-                if person_name:
-                    all_small_group_members.add(normalize_name(person_name))
-
-    print(f"   Total unique people in small groups: {len(all_small_group_members)}")
-
-    # Find serving members NOT in any small group
-    serving_members_not_in_groups = []
-    for member in rostered_members:
-        member_norm = normalize_name(member['name'])
-        if member_norm not in all_small_group_members:
-            serving_members_not_in_groups.append(member)
-
-    print(f"   ✅ Found {len(serving_members_not_in_groups)} Serving Members not in any small group")
+        for group in small_group_list:
+            group_name = group.get('name', '').lower()
+            # Skip if it's already counted as a Bible Study group
+            if is_bible_study_group(group):
+                continue
 
-    # Step 8: Detailed follow-up HTML list
-    print("\nStep 8: Generating follow-up member list...")
-    create_followup_member_list(follow_up_recent_missed, follow_up_this_year, follow_up_last_year, current_year, last_year, serving_members_not_in_groups)
+            # Add members from Kids Club, Youth Group, IFF
+            if group.get('people') and group['people'].get('person'):
+                group_people = group['people']['person']
+                if not isinstance(group_people, list):
+                    group_people = [group_people] if group_people else []
+
+                for person in group_people:
+                    first_name = (person.get('firstname') or '').strip()
+                    last_name = (person.get('lastname') or '').strip()
+                    person_name = f"{first_name} {last_name}".strip()
+                    if person_name:
+                        all_small_group_members.add(normalize_name(person_name))
+
+        print(f"   Total unique people in small groups: {len(all_small_group_members)}")
+
+        # Find serving members NOT in any small group
+        serving_members_not_in_groups = []
+        for member in rostered_members:
+            member_norm = normalize_name(member['name'])
+            if member_norm not in all_small_group_members:
+                serving_members_not_in_groups.append(member)
+
+        print(f"   ✅ Found {len(serving_members_not_in_groups)} Serving Members not in any small group")
+
+        # Step 8: Detailed follow-up HTML list
+        print("\nStep 8: Generating follow-up member list...")
+        create_followup_member_list(follow_up_recent_missed, follow_up_this_year, follow_up_last_year, current_year, last_year, serving_members_not_in_groups)
+    finally:
+        # Always collect the background PNG render, even after an error or Ctrl+C
+        if finish_chart is not None:
+            print("\nStep 7b: Saving progressive attendance chart PNG...")
+            finish_chart()
 
     return follow_up_recent_missed, follow_up_this_year, follow_up_last_year
 
 
 if __name__ == "__main__":
-    print("=" * 80)
+    print(_BANNER)
     print("BIBLE STUDY GROUP ATTENDANCE ANALYSIS - CALENDAR YEAR VERSION")
     print("   Reports on 'Last Calendar Year' and 'This Calendar Year'")
     print("   URGENT: People who missed the last 3 meetings (immediate follow-up)")
     print("   Follow-up list: Zero attendance this year first, then last year")
     print("   Bar charts show number of people per group needing follow-up")
     print("   Progressive charts show monthly attendance trends by category")
-    print("=" * 80)
+    print(_BANNER)
     
     try:
         result = create_bible_study_attendance_analysis()
         
         if result is not None:
             follow_up_recent_missed, follow_up_this_year, follow_up_last_year = result
-            total_recent_missed = sum(len(members) for members in follow_up_recent_missed.values()) if follow_up_recent_missed else 0
-            total_this_year = sum(len(members) for members in follow_up_this_year.values()) if follow_up_this_year else 0
-            total_last_year = sum(len(members) for members in follow_up_last_year.values()) if follow_up_last_year else 0
-            
-            print("\nDETAILED MEMBER FOLLOW-UP LIST:")
-            print(f"   URGENT - Missed last 3 meetings: {total_recent_missed} members")
-            print(f"   This calendar year: {total_this_year} members need follow-up")
-            print(f"   Last calendar year: {total_last_year} members need follow-up")
             
-            print("\nANALYSIS COMPLETE!")
-            print("Using REAL attendance data from your Elvanto reports!")
-            print("Calendar year analysis: Last year vs This year!")
-            print("URGENT: Recent missed meetings analysis (last 3 meetings)!")
-            print("Priority-ordered follow-up list generated!")
-            print("Bar charts show people count per group!")
-            print("Progressive monthly attendance charts created!")
-            print("IMPORTANT: Only includes people who appeared in reports but didn't attend")
-            print("(People not in church during that period are excluded)")
+            # Build the whole summary first and write it to stdout in one call
+            lines = ["\nDETAILED MEMBER FOLLOW-UP LIST:"]
+            if not (follow_up_recent_missed or follow_up_this_year or follow_up_last_year):
+                # Nothing flagged - skip the totals
+                lines.append("   No members need follow-up")
+            else:
+                lines.extend((
+                    f"   URGENT - Missed last 3 meetings: {_count_members(follow_up_recent_missed)} members",
+                    f"   This calendar year: {_count_members(follow_up_this_year)} members need follow-up",
+                    f"   Last calendar year: {_count_members(follow_up_last_year)} members need follow-up",
+                ))
+            lines += [
+                "\nANALYSIS COMPLETE!",
+                "Using REAL attendance data from your Elvanto reports!",
+                "Calendar year analysis: Last year vs This year!",
+                "URGENT: Recent missed meetings analysis (last 3 meetings)!",
+                "Priority-ordered follow-up list generated!",
+                "Bar charts show people count per group!",
+                "Progressive monthly attendance charts created!",
+                "IMPORTANT: Only includes people who appeared in reports but didn't attend",
+                "(People not in church during that period are excluded)",
+            ]
             
-            # List all created files with full paths
-            import os
+            # List all created files with full paths (cwd is fixed, so build the prefix once)
             current_dir = os.getcwd()
-            print("\nFILES CREATED:")
-            print(f"   Working Directory: {current_dir}")
+            path_prefix = current_dir + os.sep
+            lines.append("\nFILES CREATED:")
+            lines.append(f"   Working Directory: {current_dir}")
             
-            # List all HTML files in directory
-            html_files = [f for f in os.listdir('.') if f.endswith('.html') and 'bible_study' in f]
+            # One directory pass: report HTML files (with sizes) and the fallback .html/.py names.
+            # is_file() uses the dirent type, so only the report files need a stat.
+            html_files = []
+            other_files = []
+            with os.scandir('.') as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    name = entry.name
+                    if name.endswith('.html') and 'bible_study' in name:
+                        html_files.append((name, entry.stat().st_size))
+                    else:
+                        _, dot, suffix = name.rpartition('.')
+                        if dot and suffix in _LISTED_SUFFIXES:
+                            other_files.append(name)
             if html_files:
-                print("   Generated Files:")
-                for file in sorted(html_files):
-                    file_path = os.path.join(current_dir, file)
-                    file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-                    print(f"      • {file} ({file_size} bytes)")
-                    print(f"        Location: {file_path}")
+                lines.append("   Generated Files:")
+                format_file = "      • {} ({} bytes)".format
+                format_location = "        Location: {}{}".format
+                for file, file_size in sorted(html_files, key=itemgetter(0)):
+                    lines.append(format_file(file, file_size))
+                    lines.append(format_location(path_prefix, file))
                 
-                print("\nTO OPEN FILES:")
-                print(f"   1. Navigate to: {current_dir}")
-                print("   2. Double-click any .html file to open in your browser")
-                print("   3. Or copy the full path and paste into your browser address bar")
-                print("\nFILE DESCRIPTIONS:")
-                print("   • *followup_calendar_years* = Side-by-side bar charts of follow-up needs")
-                print("   • *followup_members* = Detailed member lists for follow-up")
-                print("   • *progressive_attendance* = Monthly attendance trends comparison")
+                lines.extend((
+                    "\nTO OPEN FILES:",
+                    f"   1. Navigate to: {current_dir}",
+                    "   2. Double-click any .html file to open in your browser",
+                    "   3. Or copy the full path and paste into your browser address bar",
+                    "\nFILE DESCRIPTIONS:",
+                    "   • *followup_calendar_years* = Side-by-side bar charts of follow-up needs",
+                    "   • *followup_members* = Detailed member lists for follow-up",
+                    "   • *progressive_attendance* = Monthly attendance trends comparison",
+                ))
             else:
-                print("   Warning: No Bible study HTML files found in current directory")
-                print("   All files in directory:")
-                all_files = os.listdir('.')
-                for file in all_files:
-                    if file.endswith(('.html', '.py')):
-                        print(f"      • {file}")
+                lines.append("   Warning: No Bible study HTML files found in current directory")
+                lines.append("   All files in directory:")
+                for file in other_files:
+                    lines.append(f"      • {file}")
+            
+            sys.stdout.write("\n".join(lines) + "\n")
             
         else:
             print("Analysis failed - please check your API key and report availability")
             
     except KeyboardInterrupt:
         print("\nAnalysis cancelled by user")
+        # Exit straight away with the conventional Ctrl+C status instead of waiting on the prompt
+        raise SystemExit(130)
     except Exception as e:
         print(f"\nUnexpected error: {e}")
-        import traceback
-        traceback.print_exc()
+        # Defer source-line lookups until the frames are actually formatted
+        sys.stderr.writelines(traceback.TracebackException.from_exception(e, lookup_lines=False).format())
     
-    print("\nPress Enter to exit...")
-    input()
+    # Only hold the window open for interactive runs; cron/CI/piped runs exit straight away
+    if sys.stdin.isatty():
+        input("\nPress Enter to exit...")